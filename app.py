@@ -1,17 +1,71 @@
-from flask import Flask, send_file, request, jsonify, session, url_for, redirect, flash
+from flask import Flask, send_file, request, jsonify, session, url_for, redirect, flash, make_response
+from flask.json.provider import DefaultJSONProvider
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.exc import IntegrityError
 from flask_jwt_extended import JWTManager, create_access_token, jwt_required, get_jwt_identity
 from werkzeug.security import generate_password_hash, check_password_hash
 from werkzeug.utils import secure_filename
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from flask_mail import Mail, Message
+import gzip
+import hashlib
 import os
+import tempfile
 import requests
 import uuid
 import json
 from config import Config
 
+# Optional fast paths: orjson for encoding, brotli for compression
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+DATETIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+def _json_default(obj):
+    # Keep the datetime format the API has always returned
+    if isinstance(obj, datetime):
+        return obj.strftime(DATETIME_FORMAT)
+    if isinstance(obj, date):
+        return obj.isoformat()
+    return DefaultJSONProvider.default(obj)
+
+class FastJSONProvider(DefaultJSONProvider):
+    """JSON provider that uses orjson when installed and serializes dates natively."""
+
+    def dumps(self, obj, **kwargs):
+        # Flask's response() passes indent or separators depending on compact/debug
+        indent = kwargs.pop('indent', None)
+        separators = kwargs.pop('separators', None)
+        sort_keys = kwargs.pop('sort_keys', self.sort_keys)
+        if (orjson is not None and not kwargs
+                and indent in (None, 2) and separators in (None, (',', ':'))):
+            option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+            if sort_keys:
+                option |= orjson.OPT_SORT_KEYS
+            if indent:
+                option |= orjson.OPT_INDENT_2
+            return orjson.dumps(obj, default=_json_default, option=option).decode('utf-8')
+        if indent is None and separators is None:
+            separators = (',', ':')
+        kwargs.setdefault('default', _json_default)
+        kwargs.setdefault('ensure_ascii', self.ensure_ascii)
+        return json.dumps(obj, indent=indent, separators=separators, sort_keys=sort_keys, **kwargs)
+
+    def loads(self, s, **kwargs):
+        if orjson is not None and not kwargs:
+            return orjson.loads(s)
+        return json.loads(s, **kwargs)
+
 app = Flask(__name__, static_folder='static', static_url_path='/static')
+app.json = FastJSONProvider(app)
 app.config.from_object(Config)
 # Configure upload folder and secret key
 app.config['UPLOAD_FOLDER'] = os.path.join(app.static_folder, 'images')
@@ -23,6 +77,47 @@ db = SQLAlchemy(app)
 jwt = JWTManager(app)
 mail = Mail(app)
 
+# Sparse fieldsets: ?fields=id,name limits each serialized record to those keys
+def requested_fields():
+    fields = request.args.get('fields')
+    if not fields:
+        return None
+    return {field.strip() for field in fields.split(',') if field.strip()} or None
+
+def pick_fields(data, fields=None):
+    if not fields:
+        return data
+    return {key: value for key, value in data.items() if key in fields}
+
+# Compress JSON responses above the configured size for clients that accept it
+@app.after_request
+def compress_response(response):
+    if (response.direct_passthrough
+            or response.mimetype != 'application/json'
+            or response.status_code < 200 or response.status_code >= 300
+            or 'Content-Encoding' in response.headers):
+        return response
+
+    data = response.get_data()
+    if len(data) < app.config['COMPRESS_MIN_SIZE']:
+        return response
+
+    # The body now depends on Accept-Encoding, even if this client gets it uncompressed
+    response.vary.add('Accept-Encoding')
+    accepted = request.accept_encodings
+    if brotli is not None and accepted['br']:
+        data = brotli.compress(data, quality=app.config['COMPRESS_BROTLI_QUALITY'])
+        encoding = 'br'
+    elif accepted['gzip']:
+        data = gzip.compress(data, compresslevel=app.config['COMPRESS_GZIP_LEVEL'])
+        encoding = 'gzip'
+    else:
+        return response
+
+    response.set_data(data)
+    response.headers['Content-Encoding'] = encoding
+    return response
+
 # Models
 class User(db.Model):
     __tablename__ = 'users'
@@ -36,6 +131,17 @@ class User(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     appointments = db.relationship('Appointment', backref='user', lazy=True, cascade='all, delete-orphan')
 
+    def to_dict(self, fields=None):
+        return pick_fields({
+            'id': self.id,
+            'name': self.name,
+            'email': self.email,
+            'phone': self.phone,
+            'address': self.address,
+            'profile_picture': self.profile_picture or '/static/images/default-profile.jpg',
+            'created_at': self.created_at.date() if self.created_at else None
+        }, fields)
+
 class Doctor(db.Model):
     __tablename__ = 'doctors'
     id = db.Column(db.Integer, primary_key=True)
@@ -45,6 +151,13 @@ class Doctor(db.Model):
     bio = db.Column(db.Text, nullable=True)
     appointments = db.relationship('Appointment', backref='doctor', lazy=True)
 
+    def to_dict(self, fields=None):
+        return pick_fields({
+            'id': self.id,
+            'name': self.name,
+            'specialty': self.specialty
+        }, fields)
+
 class Appointment(db.Model):
     __tablename__ = 'appointments'
     id = db.Column(db.Integer, primary_key=True)
@@ -57,16 +170,16 @@ class Appointment(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     payment = db.relationship('Payment', backref='appointment', lazy=True, uselist=False, cascade='all, delete-orphan')
     
-    def to_dict(self):
-        return {
+    def to_dict(self, fields=None):
+        return pick_fields({
             'id': self.id,
             'doctor': self.doctor.name,
-            'date': self.date.strftime('%Y-%m-%d'),
+            'date': self.date,
             'time': self.time,
             'reason': self.reason,
             'status': self.payment_status,
-            'created_at': self.created_at.strftime('%Y-%m-%d %H:%M:%S')
-        }
+            'created_at': self.created_at
+        }, fields)
 
 class Payment(db.Model):
     __tablename__ = 'payments'
@@ -85,13 +198,25 @@ class Comment(db.Model):
     content = db.Column(db.Text, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
-    def to_dict(self):
-        return {
+    def to_dict(self, fields=None):
+        return pick_fields({
             'id': self.id,
             'name': self.name,
             'content': self.content,
-            'created_at': self.created_at.strftime('%Y-%m-%d %H:%M:%S')
-        }
+            'created_at': self.created_at
+        }, fields)
+
+class IdempotencyRecord(db.Model):
+    __tablename__ = 'idempotency_records'
+    __table_args__ = (db.UniqueConstraint('user_id', 'key', name='uq_idempotency_user_key'),)
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    key = db.Column(db.String(255), nullable=False)
+    request_hash = db.Column(db.String(64), nullable=False)
+    claim_token = db.Column(db.String(32), nullable=False)
+    status_code = db.Column(db.Integer, nullable=True)
+    response_body = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
 # Seed doctors
 def seed_doctors():
@@ -120,22 +245,207 @@ def seed_test_user():
         db.session.commit()
         print("Test user created: test@example.com / testpass123")
 
+PROFILE_PICTURES_URL = '/static/images/profile_pictures/'
+
+def profile_pictures_dir():
+    return os.path.join(app.config['UPLOAD_FOLDER'], 'profile_pictures')
+
+# Pending-upload markers live outside static/ so touching them never changes a served file
+def upload_markers_dir():
+    return os.path.join(app.instance_path, 'upload_markers')
+
+def touch_upload_marker(filename):
+    markers_dir = upload_markers_dir()
+    os.makedirs(markers_dir, exist_ok=True)
+    marker_path = os.path.join(markers_dir, filename)
+    with open(marker_path, 'a'):
+        pass
+    os.utime(marker_path)
+
 # Utility to save profile picture
 def save_profile_picture(file, user_id):
     if file and file.filename:
-        # Generate a unique filename to prevent overwriting
-        unique_id = uuid.uuid4().hex[:8]
-        filename = secure_filename(f"user_{user_id}_{unique_id}.jpg")
-        
         # Create profile_pictures directory if it doesn't exist
-        profile_pics_dir = os.path.join(app.config['UPLOAD_FOLDER'], 'profile_pictures')
-        os.makedirs(profile_pics_dir, exist_ok=True)
+        pictures_dir = profile_pictures_dir()
+        os.makedirs(pictures_dir, exist_ok=True)
         
-        file_path = os.path.join(profile_pics_dir, filename)
-        file.save(file_path)
-        return f"/static/images/profile_pictures/{filename}"
+        # Stream the upload to a temp file in chunks, hashing as we go
+        digest = hashlib.sha256()
+        fd, tmp_path = tempfile.mkstemp(dir=pictures_dir, prefix='.upload-')
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                while True:
+                    chunk = file.stream.read(app.config['UPLOAD_CHUNK_SIZE'])
+                    if not chunk:
+                        break
+                    digest.update(chunk)
+                    out.write(chunk)
+            
+            # Store under the content hash so identical uploads share one file
+            filename = secure_filename(f"{digest.hexdigest()}.jpg")
+            file_path = os.path.join(pictures_dir, filename)
+            # Mark the hash as pending before it becomes visible so GC leaves it alone
+            touch_upload_marker(filename)
+            if os.path.exists(file_path):
+                os.remove(tmp_path)
+            else:
+                os.chmod(tmp_path, 0o644)
+                os.replace(tmp_path, file_path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return f"{PROFILE_PICTURES_URL}{filename}"
     return None
 
+# A recent marker means an upload whose user row may not be committed yet
+def upload_pending(filename):
+    marker_path = os.path.join(upload_markers_dir(), filename)
+    grace = app.config['PROFILE_PICTURE_GC_GRACE_PERIOD']
+    try:
+        return datetime.now().timestamp() - os.path.getmtime(marker_path) < grace
+    except OSError:
+        return False
+
+# Delete a profile picture once no user references it anymore
+def delete_profile_picture_if_orphaned(picture_path):
+    if not picture_path or not picture_path.startswith(PROFILE_PICTURES_URL):
+        return False
+    if User.query.filter_by(profile_picture=picture_path).first():
+        return False
+    filename = os.path.basename(picture_path)
+    if upload_pending(filename):
+        return False
+    file_path = os.path.join(profile_pictures_dir(), filename)
+    try:
+        os.remove(file_path)
+        return True
+    except OSError as e:
+        print(f"Failed to delete profile picture {file_path}: {str(e)}")
+        return False
+
+# Remove every file in profile_pictures that no user references
+def collect_orphaned_profile_pictures():
+    pictures_dir = profile_pictures_dir()
+    if not os.path.isdir(pictures_dir):
+        return 0
+    referenced = {
+        os.path.basename(path)
+        for (path,) in db.session.query(User.profile_picture).filter(User.profile_picture.isnot(None))
+    }
+    removed = 0
+    for filename in os.listdir(pictures_dir):
+        # Skip in-flight uploads and anything still in use
+        if filename.startswith('.') or filename in referenced:
+            continue
+        file_path = os.path.join(pictures_dir, filename)
+        if os.path.isfile(file_path) and not upload_pending(filename):
+            os.remove(file_path)
+            removed += 1
+    
+    # Drop markers whose grace period is over
+    markers_dir = upload_markers_dir()
+    if os.path.isdir(markers_dir):
+        for filename in os.listdir(markers_dir):
+            if not upload_pending(filename):
+                os.remove(os.path.join(markers_dir, filename))
+    return removed
+
+@app.cli.command('gc-profile-pictures')
+def gc_profile_pictures_command():
+    """Delete profile pictures that are no longer referenced by any user."""
+    removed = collect_orphaned_profile_pictures()
+    print(f"Removed {removed} orphaned profile picture(s)")
+
+# Content-addressed uploads never change, so let clients cache them forever
+@app.after_request
+def cache_profile_pictures(response):
+    # 304 headers replace the cached ones and 206 serves range requests, so cover both too
+    if (request.endpoint == 'static' and request.path.startswith(PROFILE_PICTURES_URL)
+            and response.status_code in (200, 206, 304)):
+        response.cache_control.no_cache = None
+        response.cache_control.public = True
+        response.cache_control.max_age = 31536000
+        response.cache_control.immutable = True
+    return response
+
+# Idempotency keys: replay the stored response when a client retries a request
+def idempotency_request_hash():
+    payload = json.dumps(sorted(request.form.items(multi=True)), separators=(',', ':'))
+    return hashlib.sha256(f"{request.method} {request.path} {payload}".encode('utf-8')).hexdigest()
+
+def claim_idempotency_key(key, user_id):
+    """Reserve a key for this request, or return the response to send instead.
+
+    The claim is an (id, claim_token) pair; store_idempotent_response only
+    writes to the record while its claim_token still matches.
+    """
+    now = datetime.utcnow()
+    cutoff = now - timedelta(seconds=app.config['IDEMPOTENCY_KEY_TTL'])
+    IdempotencyRecord.query.filter(IdempotencyRecord.created_at < cutoff).delete()
+    db.session.commit()
+    
+    request_hash = idempotency_request_hash()
+    claim_token = uuid.uuid4().hex
+    record = IdempotencyRecord(
+        user_id=user_id,
+        key=key,
+        request_hash=request_hash,
+        claim_token=claim_token,
+        created_at=now
+    )
+    db.session.add(record)
+    try:
+        db.session.commit()
+        return (record.id, claim_token), None
+    except IntegrityError:
+        db.session.rollback()
+    
+    existing = IdempotencyRecord.query.filter_by(user_id=user_id, key=key).first()
+    if existing is None:
+        return None, (jsonify({'error': 'Could not process Idempotency-Key, please retry'}), 409)
+    if existing.request_hash != request_hash:
+        return None, (jsonify({'error': 'Idempotency-Key was already used with different request parameters'}), 422)
+    if existing.status_code is None:
+        # A claim older than the lock timeout belongs to a request that died; take it over
+        lock_cutoff = now - timedelta(seconds=app.config['IDEMPOTENCY_LOCK_TIMEOUT'])
+        if existing.created_at >= lock_cutoff:
+            return None, (jsonify({'error': 'A request with this Idempotency-Key is still being processed'}), 409)
+        taken_over = IdempotencyRecord.query.filter_by(
+            id=existing.id,
+            status_code=None,
+            claim_token=existing.claim_token
+        ).update({'claim_token': claim_token, 'created_at': now}, synchronize_session=False)
+        db.session.commit()
+        if not taken_over:
+            return None, (jsonify({'error': 'A request with this Idempotency-Key is still being processed'}), 409)
+        return (existing.id, claim_token), None
+    
+    response = app.response_class(existing.response_body, status=existing.status_code, mimetype='application/json')
+    response.headers['Idempotent-Replayed'] = 'true'
+    return None, response
+
+def store_idempotent_response(claim, response):
+    # Only successful responses are replayed; failures free the key for a retry.
+    # Filtering on claim_token leaves the record alone if another request took it over.
+    try:
+        succeeded = 200 <= response.status_code < 300
+        if not succeeded:
+            db.session.rollback()
+        record_id, claim_token = claim
+        owned = IdempotencyRecord.query.filter_by(id=record_id, status_code=None, claim_token=claim_token)
+        if succeeded:
+            owned.update({
+                'status_code': response.status_code,
+                'response_body': response.get_data(as_text=True)
+            }, synchronize_session=False)
+        else:
+            owned.delete(synchronize_session=False)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        print(f"Failed to store idempotent response: {str(e)}")
+
 # Send appointment confirmation email
 def send_appointment_email(user, appointment, doctor):
     try:
@@ -195,94 +505,114 @@ def contact():
         return jsonify({'error': 'Feedback sent successfully!'})
     return send_file('html/contact.html')
 
+# Validate a booking request, initiate payment and create the appointment
+def create_booking(user_id):
+    data = request.form
+    doctor_id = data.get('doctor_id')
+    date_str = data.get('date')
+    time = data.get('time')
+    reason = data.get('reason')
+
+    if not all([doctor_id, date_str, time]):
+        return jsonify({'error': 'Doctor, date and time are required'}), 400
+        
+    try:
+        # Validate date format
+        date = datetime.strptime(date_str, '%Y-%m-%d')
+        
+        # Check if date is in the future
+        if date.date() < datetime.now().date():
+            return jsonify({'error': 'Appointment date must be in the future'}), 400
+            
+        # Get user and doctor
+        user = User.query.get_or_404(user_id)
+        doctor = Doctor.query.get_or_404(doctor_id)
+        
+        # Check for existing appointments at the same time
+        existing_appointment = Appointment.query.filter_by(
+            doctor_id=doctor_id,
+            date=date,
+            time=time
+        ).first()
+        
+        if existing_appointment:
+            return jsonify({'error': 'This time slot is already booked'}), 400
+
+        # Create payment reference
+        tx_ref = f'GRACE_{user_id}_{uuid.uuid4().hex[:8]}_{datetime.now().timestamp()}'
+        
+        # Prepare payment data for Flutterwave
+        payment_data = {
+            'tx_ref': tx_ref,
+            'amount': 5000,
+            'currency': 'NGN',
+            'redirect_url': url_for('payment_callback', _external=True),
+            'customer': {
+                'email': user.email,
+                'name': user.name,
+                'phone_number': user.phone or 'N/A'
+            },
+            'customizations': {
+                'title': 'Graceland Hospital Appointment',
+                'description': f'Appointment with {doctor.name} on {date_str} at {time}'
+            }
+        }
+        
+        # Initialize payment with Flutterwave
+        headers = {'Authorization': f'Bearer {app.config["FLUTTERWAVE_SECRET_KEY"]}'}
+        response = requests.post(
+            'https://api.flutterwave.com/v3/payments',
+            json=payment_data,
+            headers=headers,
+            timeout=app.config['FLUTTERWAVE_TIMEOUT']
+        )
+        
+        if response.status_code == 200:
+            # Create appointment record
+            appointment = Appointment(
+                user_id=user_id, 
+                doctor_id=doctor_id, 
+                date=date, 
+                time=time,
+                reason=reason
+            )
+            db.session.add(appointment)
+            db.session.commit()
+            
+            # Return payment link to frontend
+            return jsonify({
+                'message': 'Appointment created, proceed to payment',
+                'payment_url': response.json()['data']['link'],
+                'appointment_id': appointment.id
+            })
+        else:
+            return jsonify({'error': 'Payment initiation failed. Please try again.'}), 400
+            
+    except ValueError as e:
+        return jsonify({'error': f'Invalid date format: {str(e)}'}), 400
+    except Exception as e:
+        print(f"Appointment booking error: {str(e)}")
+        return jsonify({'error': 'An error occurred while booking your appointment'}), 500
+
 @app.route('/book', methods=['GET', 'POST'])
 def book():
     if request.method == 'POST':
         if 'user_id' not in session:
             return jsonify({'error': 'Authentication required'}), 401
             
-        data = request.form
-        doctor_id = data.get('doctor_id')
-        date_str = data.get('date')
-        time = data.get('time')
-        reason = data.get('reason')
         user_id = session['user_id']
-
-        if not all([doctor_id, date_str, time]):
-            return jsonify({'error': 'Doctor, date and time are required'}), 400
-            
-        try:
-            # Validate date format
-            date = datetime.strptime(date_str, '%Y-%m-%d')
+        idempotency_key = request.headers.get('Idempotency-Key')
+        if not idempotency_key:
+            return create_booking(user_id)
+        if len(idempotency_key) > 255:
+            return jsonify({'error': 'Idempotency-Key must be at most 255 characters'}), 400
             
-            # Check if date is in the future
-            if date.date() < datetime.now().date():
-                return jsonify({'error': 'Appointment date must be in the future'}), 400
-                
-            # Get user and doctor
-            user = User.query.get_or_404(user_id)
-            doctor = Doctor.query.get_or_404(doctor_id)
-            
-            # Check for existing appointments at the same time
-            existing_appointment = Appointment.query.filter_by(
-                doctor_id=doctor_id,
-                date=date,
-                time=time
-            ).first()
-            
-            if existing_appointment:
-                return jsonify({'error': 'This time slot is already booked'}), 400
-
-            # Create payment reference
-            tx_ref = f'GRACE_{user_id}_{uuid.uuid4().hex[:8]}_{datetime.now().timestamp()}'
-            
-            # Prepare payment data for Flutterwave
-            payment_data = {
-                'tx_ref': tx_ref,
-                'amount': 5000,
-                'currency': 'NGN',
-                'redirect_url': url_for('payment_callback', _external=True),
-                'customer': {
-                    'email': user.email,
-                    'name': user.name,
-                    'phone_number': user.phone or 'N/A'
-                },
-                'customizations': {
-                    'title': 'Graceland Hospital Appointment',
-                    'description': f'Appointment with {doctor.name} on {date_str} at {time}'
-                }
-            }
-            
-            # Initialize payment with Flutterwave
-            headers = {'Authorization': f'Bearer {app.config["FLUTTERWAVE_SECRET_KEY"]}'}
-            response = requests.post('https://api.flutterwave.com/v3/payments', json=payment_data, headers=headers)
-            
-            if response.status_code == 200:
-                # Create appointment record
-                appointment = Appointment(
-                    user_id=user_id, 
-                    doctor_id=doctor_id, 
-                    date=date, 
-                    time=time,
-                    reason=reason
-                )
-                db.session.add(appointment)
-                db.session.commit()
-                
-                # Return payment link to frontend
-                return jsonify({
-                    'message': 'Appointment created, proceed to payment',
-                    'payment_url': response.json()['data']['link'],
-                    'appointment_id': appointment.id
-                })
-            else:
-                return jsonify({'error': 'Payment initiation failed. Please try again.'}), 400
-                
-        except ValueError as e:
-            return jsonify({'error': f'Invalid date format: {str(e)}'}), 400
-        except Exception as e:
-            print(f"Appointment booking error: {str(e)}")
-            return jsonify({'error': 'An error occurred while booking your appointment'}), 500
+        claim, replay = claim_idempotency_key(idempotency_key, user_id)
+        if replay is not None:
+            return replay
+        response = make_response(create_booking(user_id))
+        store_idempotent_response(claim, response)
+        return response
             
     # GET request - return booking page
     doctors = Doctor.query.all()
@@ -384,6 +714,7 @@ def profile():
             user.password = generate_password_hash(new_password, method='pbkdf2:sha256')
         
         # Update profile picture if provided
+        old_picture = user.profile_picture
         profile_picture = request.files.get('profile-picture')
         if profile_picture and profile_picture.filename:
             picture_path = save_profile_picture(profile_picture, user_id)
@@ -392,19 +723,16 @@ def profile():
         
         try:
             db.session.commit()
+            # Clean up the previous picture if nobody else shares it
+            if old_picture != user.profile_picture:
+                delete_profile_picture_if_orphaned(old_picture)
             # Update session data
             session['user_name'] = user.name
             session['user_email'] = user.email
             
             return jsonify({
                 'message': 'Profile updated successfully!',
-                'user': {
-                    'name': user.name,
-                    'email': user.email,
-                    'phone': user.phone,
-                    'address': user.address,
-                    'profile_picture': user.profile_picture or '/static/images/default-profile.jpg'
-                },
+                'user': user.to_dict({'name', 'email', 'phone', 'address', 'profile_picture'}),
                 'profile_picture': user.profile_picture or '/static/images/default-profile.jpg'
             })
         except Exception as e:
@@ -502,11 +830,7 @@ def login():
                 return jsonify({
                     'message': 'Login successful', 
                     'access_token': access_token,
-                    'user': {
-                        'id': user.id,
-                        'name': user.name,
-                        'email': user.email
-                    },
+                    'user': user.to_dict({'id', 'name', 'email'}),
                     'redirect': '/'
                 })
             else:
@@ -526,7 +850,8 @@ def logout():
 @app.route('/api/doctors')
 def get_doctors():
     doctors = Doctor.query.all()
-    return jsonify([{'id': d.id, 'name': d.name, 'specialty': d.specialty} for d in doctors])
+    fields = requested_fields()
+    return jsonify([doctor.to_dict(fields) for doctor in doctors])
 
 @app.route('/api/profile')
 def get_profile():
@@ -536,18 +861,11 @@ def get_profile():
     user_id = session['user_id']
     user = User.query.get_or_404(user_id)
     appointments = Appointment.query.filter_by(user_id=user_id).order_by(Appointment.date.desc()).all()
+    fields = requested_fields()
     
     return jsonify({
-        'user': {
-            'id': user.id,
-            'name': user.name,
-            'email': user.email,
-            'phone': user.phone,
-            'address': user.address,
-            'profile_picture': user.profile_picture or '/static/images/default-profile.jpg',
-            'created_at': user.created_at.strftime('%Y-%m-%d')
-        },
-        'appointments': [appointment.to_dict() for appointment in appointments]
+        'user': user.to_dict(),
+        'appointments': [appointment.to_dict(fields) for appointment in appointments]
     })
     
 @app.route('/api/comments', methods=['GET', 'POST'])
@@ -583,8 +901,9 @@ def comments():
     # GET request - return all comments
     try:
         comments = Comment.query.order_by(Comment.created_at.desc()).limit(50).all()
+        fields = requested_fields()
         return jsonify({
-            'comments': [comment.to_dict() for comment in comments]
+            'comments': [comment.to_dict(fields) for comment in comments]
         })
     except Exception as e:
         return jsonify({'error': f'Failed to fetch comments: {str(e)}'}), 500
@@ -594,8 +913,9 @@ def comments():
 def get_comments():
     try:
         comments = Comment.query.order_by(Comment.created_at.desc()).limit(50).all()
+        fields = requested_fields()
         return jsonify({
-            'comments': [comment.to_dict() for comment in comments]
+            'comments': [comment.to_dict(fields) for comment in comments]
         })
     except Exception as e:
         return jsonify({'error': f'Failed to fetch comments: {str(e)}'}), 500
@@ -4,6 +4,7 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', 'sqlite:///graceland.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     FLUTTERWAVE_SECRET_KEY = os.environ.get('FLUTTERWAVE_SECRET_KEY', 'your-flutterwave-secret-key-here')
+    FLUTTERWAVE_TIMEOUT = int(os.environ.get('FLUTTERWAVE_TIMEOUT', 15))
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY', 'your-jwt-secret-key-here')
     MAIL_SERVER = os.environ.get('MAIL_SERVER', 'smtp.gmail.com')
     MAIL_PORT = int(os.environ.get('MAIL_PORT', 587))
@@ -11,3 +12,10 @@ class Config:
     MAIL_USERNAME = os.environ.get('MAIL_USERNAME', 'info@gracelandmultispecialisthospital.com')
     MAIL_PASSWORD = os.environ.get('MAIL_PASSWORD', 'graceland-2012')
     MAIL_DEFAULT_SENDER = os.environ.get('MAIL_DEFAULT_SENDER', 'info@gracelandmultispecialisthospital.com')
+    COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', 500))
+    COMPRESS_GZIP_LEVEL = int(os.environ.get('COMPRESS_GZIP_LEVEL', 6))
+    COMPRESS_BROTLI_QUALITY = int(os.environ.get('COMPRESS_BROTLI_QUALITY', 5))
+    UPLOAD_CHUNK_SIZE = int(os.environ.get('UPLOAD_CHUNK_SIZE', 64 * 1024))
+    PROFILE_PICTURE_GC_GRACE_PERIOD = int(os.environ.get('PROFILE_PICTURE_GC_GRACE_PERIOD', 60 * 60))
+    IDEMPOTENCY_KEY_TTL = int(os.environ.get('IDEMPOTENCY_KEY_TTL', 24 * 60 * 60))
+    IDEMPOTENCY_LOCK_TIMEOUT = int(os.environ.get('IDEMPOTENCY_LOCK_TIMEOUT', 60))